@@ -26,6 +26,16 @@ def call(*args):
     subprocess.check_call(args)
 
 
+def create_flash_image(path, src='', size=64 * 1024 * 1024):
+    # Zero padded pflash image, equivalent to dd if=/dev/zero followed by dd
+    # conv=notrunc of src, without spawning any processes
+    with open(path, 'wb') as f:
+        if src:
+            with open(src, 'rb') as s:
+                shutil.copyfileobj(s, f)
+        f.truncate(max(size, f.tell()))
+
+
 def build_vm(chroot: Chroot):
     if os.path.exists(chroot.vm_path):
         shutil.rmtree(chroot.vm_path)
@@ -59,9 +69,8 @@ def build_vm(chroot: Chroot):
         fw = os.path.join(base, f'virtual_machine/firmware/{chroot.image_name}-arm64-efi.fd')
         code = 'firmware/efi-code.img'
         evars = 'firmware/efi-vars.img'
-        call(f'dd if=/dev/zero of={code} bs=1M count=64')
-        call(f'dd if={fw} of={code} conv=notrunc')
-        call(f'dd if=/dev/zero of={evars} bs=1M count=64')
+        create_flash_image(code, fw)
+        create_flash_image(evars)
         firmware.append('# Firmware')
         firmware.append(f'-drive if=pflash,format=raw,readonly=on,unit=0,file="{code}"')
         firmware.append(f'-drive if=pflash,format=raw,readonly=off,unit=1,file="{evars}"')
@@ -87,13 +96,12 @@ def build_vm(chroot: Chroot):
         call('genisoimage -output cloud.img -volid cidata -joliet -rock user-data meta-data')
         call('qemu-img convert -f raw -O qcow2 cloud.img cloud-init.qcow2')
         os.remove('cloud.img')
-        call('fallocate -l 64G SystemDisk.img')
-        # we cannot create this here because newer ext4 filesystems have
-        # orphan_file feature which the gues may not have, in which case
-        # fsck fails for this disk. Instead create via cloud-init
-        # call('mkfs.ext4 -L datadisk -F SystemDisk.img')
-        call('qemu-img convert -f raw -O qcow2 SystemDisk.img SystemDisk.qcow2')
-        os.remove('SystemDisk.img')
+        # An empty sparse image, there is no need to allocate a 64G raw file
+        # and convert it. We cannot create the filesystem here because newer
+        # ext4 filesystems have orphan_file feature which the gues may not
+        # have, in which case fsck fails for this disk. Instead create via
+        # cloud-init
+        call('qemu-img create -f qcow2 SystemDisk.qcow2 64G')
         if is_arm:
             add_efi_firmware()
         shutil.copy2(cloud_image, '.')
@@ -7,19 +7,15 @@ import glob
 import json
 import os
 import shlex
+import shutil
 from urllib.request import urlopen
 
+from virtual_machine.run import USER
+
 from .conf import parse_conf_file
 from .constants import base_dir
 from .utils import single_instance
 
-try:
-    import pwd
-except ModuleNotFoundError:
-    USER = os.environ.get('USER', 'kovid')
-else:
-    USER = pwd.getpwuid(os.geteuid()).pw_name
-
 
 RECOGNIZED_ARCHES = {
     'arm64': 'qemu-aarch64',
@@ -34,9 +30,11 @@ def cached_download(url):
     local = os.path.join(d, bn)
     if not os.path.exists(local):
         print('Downloading', url, '...')
-        data = urlopen(url).read()
-        with open(local, 'wb') as f:
-            f.write(data)
+        # stream to a temp file and rename so an interrupted download does
+        # not leave a truncated file in the cache
+        with urlopen(url) as r, open(local + '.part', 'wb') as f:
+            shutil.copyfileobj(r, f, length=1 << 20)
+        os.replace(local + '.part', local)
     return local
 
 
@@ -60,11 +58,10 @@ def install_modern_go(image_name, image_arch, go_version='1.21.0'):
         image_arch = '386'
     gof = f'go{go_version}.linux-{image_arch}.tar.gz'
     yield 'start_custom_apt'
-    yield f'echo Downloading {gof}'
-    yield ['sh', '-c', f'curl -L https://go.dev/dl/{gof} > {gof}']
     yield 'rm -rf /usr/local/go'
-    yield f'tar -C /usr/local -xzf {gof}'
-    yield f'rm -f {gof}'
+    yield f'echo Downloading {gof}'
+    # extract while downloading rather than staging the tarball on disk
+    yield ['sh', '-c', f'curl -L https://go.dev/dl/{gof} | tar -C /usr/local -xzf -']
     yield 'ln -s /usr/local/go/bin/go /usr/local/bin/go'
     yield 'ln -s /usr/local/go/bin/gofmt /usr/local/bin/gofmt'
     yield 'go version'
@@ -78,8 +75,7 @@ def install_modern_cmake(image_name):
     yield ['sh', '-c', f"echo 'deb [signed-by={kitware}]'" f' https://apt.kitware.com/ubuntu/ {image_name} main' ' > /etc/apt/sources.list.d/kitware.list']
     yield 'apt-get update'
     yield f'rm {kitware}'
-    yield 'apt-get install -y kitware-archive-keyring'
-    yield 'apt-get install -y cmake'
+    yield 'apt-get install -y kitware-archive-keyring cmake'
     yield 'end_custom_apt'
 
 
@@ -157,11 +153,19 @@ class Chroot:
         cmds = []
         sources = {}
         files = []
+        home = os.path.expanduser('~')
         try:
-            ssh_authorized_keys = [x.strip() for x in open(os.path.expanduser('~/.ssh/authorized_keys'))]
+            ssh_authorized_keys = [x.strip() for x in open(os.path.join(home, '.ssh', 'authorized_keys'))]
         except FileNotFoundError:
             ssh_authorized_keys = []
 
+        def read_host_file(path):
+            try:
+                with open(path, 'rb') as f:
+                    return f.read()
+            except FileNotFoundError:
+                return None
+
         def file(path, data, append=False, owner='root:root', permissions='0644', defer=False):
             if isinstance(data, str):
                 data = data.encode('utf-8')
@@ -186,14 +190,15 @@ date >> /root/fix-mounting-ran-at
 
         user = USER
         for user_file in ('.zshrc', '.vimrc'):
-            path = os.path.expanduser(f'~/{user_file}')
-            if os.path.exists(path):
-                file(f'/home/{user}/{user_file}', open(path).read(), owner=f'{user}:crusers', defer=True)
+            data = read_host_file(os.path.join(home, user_file))
+            if data is not None:
+                file(f'/home/{user}/{user_file}', data, owner=f'{user}:crusers', defer=True)
 
         if 'KITTY_INSTALLATION_DIR' in os.environ:
             shi = os.path.join(os.environ['KITTY_INSTALLATION_DIR'], 'shell-integration', 'zsh', 'kitty.zsh')
-            if os.path.exists(shi):
-                file(f'/home/{user}/kitty.zsh', open(shi).read(), owner=f'{user}:crusers', defer=True)
+            data = read_host_file(shi)
+            if data is not None:
+                file(f'/home/{user}/kitty.zsh', data, owner=f'{user}:crusers', defer=True)
             ti = os.path.join(os.environ['KITTY_INSTALLATION_DIR'], 'terminfo', 'x', 'xterm-kitty')
             if os.path.exists(ti):
                 file('/usr/share/terminfo/x/xterm-kitty', open(ti, 'rb').read())
@@ -10,8 +10,9 @@ import sys
 import time
 from functools import lru_cache
 from operator import itemgetter
+from urllib.error import ContentTooShortError
 from urllib.parse import urljoin
-from urllib.request import urlopen, urlretrieve
+from urllib.request import urlopen
 
 from .constants import OS_NAME, SOURCES, SRC, iswindows
 
@@ -107,16 +108,27 @@ def read_deps(only_buildable=True):
     return ans
 
 
+def file_hash(f, alg='sha256'):
+    h = getattr(hashlib, alg.lower())()
+    for chunk in iter(lambda: f.read(1 << 20), b''):
+        h.update(chunk)
+    return h.hexdigest()
+
+
 def sha256_for_pkg(pkg):
     fname = os.path.join(SOURCES, pkg['filename'])
     with open(fname, 'rb') as f:
-        return hashlib.sha256(f.read()).hexdigest()
+        return file_hash(f)
+
+
+def expected_hash(pkg):
+    alg, q = pkg['hash'].partition(':')[::2]
+    return alg, q.strip()
 
 
 def verify_hash(pkg):
     fname = os.path.join(SOURCES, pkg['filename'])
-    alg, q = pkg['hash'].partition(':')[::2]
-    q = q.strip()
+    alg, q = expected_hash(pkg)
     matched = False
     try:
         f = open(fname, 'rb')
@@ -124,9 +136,7 @@ def verify_hash(pkg):
         pass
     else:
         with f:
-            h = getattr(hashlib, alg.lower())
-            fhash = h(f.read()).hexdigest()
-            matched = fhash == q
+            matched = file_hash(f, alg) == q
     return matched
 
 
@@ -153,6 +163,27 @@ def reporthook():
     return report
 
 
+def download_and_hash(url, fname, alg):
+    # Hash the data as it is written so the file does not need to be read
+    # back from disk to be verified
+    h = getattr(hashlib, alg.lower())()
+    report = reporthook()
+    block_size = 1 << 16
+    with urlopen(url) as r, open(fname, 'wb') as f:
+        total_size = int(r.headers.get('Content-Length') or -1)
+        count = size = 0
+        for chunk in iter(lambda: r.read(block_size), b''):
+            f.write(chunk)
+            h.update(chunk)
+            size += len(chunk)
+            count += 1
+            report(count, block_size, total_size)
+    if total_size >= 0 and size < total_size:
+        raise ContentTooShortError(
+            f'retrieval incomplete: got only {size} out of {total_size} bytes', (fname, r.headers))
+    return h.hexdigest()
+
+
 def get_pypi_url(pkg):
     if pkg['filename'].endswith('.whl'):
         pkg_name = pkg['filename'].partition('-')[0]
@@ -185,8 +216,8 @@ def try_once(pkg, url):
     elif url.startswith('github:'):
         url = get_github_url(url)
     print('Downloading', filename, 'from', url)
-    urlretrieve(url, fname, reporthook())
-    if not verify_hash(pkg):
+    alg, q = expected_hash(pkg)
+    if download_and_hash(url, fname, alg) != q:
         raise SystemExit(
             f'The hash of the downloaded file: {filename}'
             ' does not match the saved hash. It\'s sha256 is'
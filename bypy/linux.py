@@ -3,6 +3,9 @@
 # License: GPLv3 Copyright: 2019, Kovid Goyal <kovid at kovidgoyal.net>
 
 import os
+import sys
+import time
+from contextlib import contextmanager
 
 from virtual_machine.run import shutdown, wait_for_ssh
 
@@ -12,6 +15,26 @@ from .vms import Rsync, get_vm_spec
 from .utils import setup_build_parser
 
 
+@contextmanager
+def _phase(name):
+    # Report the resources used by child processes during a phase, enabled
+    # by setting BYPY_PROFILE. Useful to see whether a phase is dominated by
+    # process spawning/IO or by actual computation.
+    if not os.environ.get('BYPY_PROFILE'):
+        yield
+        return
+    import resource
+    before, st = resource.getrusage(resource.RUSAGE_CHILDREN), time.monotonic()
+    try:
+        yield
+    finally:
+        after = resource.getrusage(resource.RUSAGE_CHILDREN)
+        deltas = ' '.join(
+            f'{x}={getattr(after, "ru_" + x) - getattr(before, "ru_" + x):.6g}'
+            for x in ('utime', 'stime', 'nvcsw', 'nivcsw', 'inblock', 'oublock'))
+        print(f'[profile] {name}: wall={time.monotonic() - st:.2f}s {deltas}', file=sys.stderr, flush=True)
+
+
 def setup_parser(p):
     p.add_argument('--arch', default='64', choices=RECOGNIZED_ARCHES, help='The architecture to build for')
     s = setup_build_parser(p)
@@ -33,12 +56,14 @@ def main(args):
     os.makedirs(pkg_dir, exist_ok=True)
 
     if args.action == 'vm':
-        chroot.build_vm()
+        with _phase('build_vm'):
+            chroot.build_vm()
         return
 
     ba = f'linux-{args.arch}'
     cmd = ['python3', os.path.join('/', 'bypy'), f'BYPY_ARCH={ba}']
-    port = wait_for_ssh(vm)
+    with _phase('wait_for_ssh'):
+        port = wait_for_ssh(vm)
     rsync = Rsync(vm, port)
 
     if args.arch == 'arm64':
@@ -46,9 +71,11 @@ def main(args):
         rsync.run_via_ssh('sudo', 'mount', '-a', raise_exception=False)
 
     if args.action == 'shell':
-        return rsync.run_shell(sources_dir, pkg_dir, output_dir, cmd, ba, args)
+        with _phase('shell'):
+            return rsync.run_shell(sources_dir, pkg_dir, output_dir, cmd, ba, args)
 
     if not chroot.single_instance():
         raise SystemExit(f'Another instance of the Linux container {chroot.single_instance_name} is running')
 
-    rsync.main(sources_dir, pkg_dir, output_dir, cmd, args)
+    with _phase('run'):
+        rsync.main(sources_dir, pkg_dir, output_dir, cmd, args)
@@ -175,9 +175,7 @@ def current_env(library_path=False):
         env['LD_LIBRARY_PATH'] = library_path
     if ismacos:
         # Sanitize homebrew gunk
-        for k in tuple(env):
-            if k.startswith('HOMEBREW'):
-                del env[k]
+        env = {k: v for k, v in env.items() if not k.startswith('HOMEBREW')}
         env['PATH'] = ':'.join(x for x in env['PATH'].split(':') if 'homebrew' not in x)
     return env
 
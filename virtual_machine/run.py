@@ -21,6 +21,7 @@ BUILD_VM_USER = 'kovid'
 ssh_masters = set()
 disable_known_hosts = ['-o', 'UserKnownHostsFile=/dev/null', '-o', 'StrictHostKeyChecking=no', '-o', 'LogLevel=ERROR']
 
+# USER is also used by bypy.chroot, this is the only place it is looked up
 try:
     import pwd
 except ModuleNotFoundError:
@@ -88,24 +89,22 @@ def run_monitor_command(monitor_path, cmd='info usernet', data_is_complete=lambd
         if not get_output:
             return ''
         data = b''
-        begin = monotonic()
-        s.setblocking(False)
+        # block in recv() until data arrives rather than polling, the output
+        # is complete once the monitor has been idle for timeout seconds
+        s.settimeout(timeout)
         while True:
-            if data and monotonic() - begin > timeout:
-                break
             try:
                 q = s.recv(4096)
-            except BlockingIOError:
-                sleep(0.001)
+            except socket.timeout:
+                if data:
+                    break
                 continue
-            if q:
-                data += q
-                q = data.decode('utf-8', 'replace')
-                if data_is_complete(q):
-                    return q
-                begin = monotonic()
-            else:
-                sleep(0.01)
+            if not q:
+                break
+            data += q
+            q = data.decode('utf-8', 'replace')
+            if data_is_complete(q):
+                return q
         return data.decode('utf-8', 'replace')
 
 
@@ -320,7 +319,7 @@ def shutdown_vm_dir(vm_dir):
     m = metadata_from_vm_dir(vm_dir)
     system = m['os']
     print('Shutting down', system, file=sys.stderr)
-    run_monitor_command(monitor_path, 'system_powerdown')
+    run_monitor_command(monitor_path, 'system_powerdown', get_output=False)
     if not m['is_accelerated']:
         timeout *= 2
     while os.path.exists(monitor_path) and monotonic() - start < timeout:
@@ -328,7 +327,7 @@ def shutdown_vm_dir(vm_dir):
     if os.path.exists(monitor_path):
         if start >= 0:
             print(vm_dir, 'failed to shutdown in', timeout, 'seconds. Halting', file=sys.stderr)
-        run_monitor_command(monitor_path, 'quit')
+        run_monitor_command(monitor_path, 'quit', get_output=False)
 
 
 @remote_or_local('ensure_halted')
@@ -341,7 +340,7 @@ def ensure_halted(vm_dir):
     if os.path.exists(monitor_path):
         if start >= 0:
             print(vm_dir, 'failed to shutdown in', timeout, 'seconds. Halting', file=sys.stderr)
-        run_monitor_command(monitor_path, 'quit')
+        run_monitor_command(monitor_path, 'quit', get_output=False)
 
 
 def shutdown(spec):